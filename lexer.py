@@ -8,6 +8,8 @@ Lexer functionality.
 __author__ = 'johnrickE'
 
 
+from fsa import NUM_CHARS
+
 from parser import END, LexerError
 
 
@@ -15,6 +17,40 @@ from parser import END, LexerError
 WHITESPACE = 0
 
 
+def scan(source, position, state, transitions, outputs):
+    """
+    Runs the lexer DFA on the input, starting from the given position and state, until
+    no more transitions can be made.
+
+    :param source       The bytes to scan.
+    :param position     The position of the first byte to scan.
+    :param state        The DFA state to start from.
+    :param transitions  The flat DFA transition table.
+    :param outputs      A list mapping each DFA state to its output, or None if the state is not accepting.
+
+    :return A tuple containing the output of the longest token found (or None if no token was found)
+            and the position directly after that token.
+    """
+    lexeme = None
+    new_position = position
+
+    if outputs[state] is not None:
+        lexeme = outputs[state]
+        new_position = position + 1
+
+    length = len(source)
+    while position < length:
+        state = transitions[state * NUM_CHARS + source[position]]
+        if state < 0:
+            break
+        position += 1
+        if outputs[state] is not None:
+            lexeme = outputs[state]
+            new_position = position
+
+    return lexeme, new_position
+
+
 class Lexer:
     """
     A lexical analyser (lexer), performs tokenization on a raw byte stream.
@@ -24,15 +60,18 @@ class Lexer:
         """
         Constructs a new Lexer object.
 
-        :param transitions      The DFA transition table. This should be generated from the lexergen.LexerGenerator class.
+        :param transitions      The flat DFA transition table. This should be generated from the lexergen.LexerGenerator class.
         :param initial_state    The DFA initial state. This should be generated from the lexergen.LexerGenerator class.
         :param outputs          The state outputs dictionary. This should be generated from the lexergen.LexerGenerator class.
-        :param source           The input stream of bytes to tokenize.
+        :param source           The input stream of bytes to tokenize. This must be a bytes-like object, not a str.
         """
         self.transitions = transitions
         self.initial_state = initial_state
-        self.outputs = outputs
-        self.source = source
+        # Dense list mapping each DFA state to its output, or None if the state is not accepting.
+        self.outputs = [outputs.get(state) for state in range(0, len(transitions) // NUM_CHARS)]
+        if not isinstance(source, (bytes, bytearray, memoryview)):
+            raise TypeError('Lexer source must be bytes, not {}'.format(type(source).__name__))
+        self.source = bytes(source)
         self.position = 0
     
     def lex(self):
@@ -56,27 +95,9 @@ class Lexer:
         if self.position >= len(self.source):
             return END, None
 
-        state = self.initial_state
         old_position = self.position
-        new_position = old_position
-        position = old_position
-        lexeme = None
-
-        if state in self.outputs:
-            lexeme = self.outputs[state]
-            new_position = position + 1
-
-        for c in self.source[old_position:]:
-            key = state, ord(c)
-            if key not in self.transitions:
-                break
-            next_state = self.transitions[key]
-            if next_state in self.outputs:
-                lexeme = self.outputs[next_state]
-                new_position = position + 1
-            state = next_state
-            position += 1
-        
+        lexeme, new_position = scan(self.source, old_position, self.initial_state, self.transitions, self.outputs)
+
         if lexeme is None:
             raise LexerError('Invalid token')
         self.position = new_position
@@ -8,6 +8,8 @@ Lexer generation functionality.
 __author__ = 'johnrickE'
 
 
+import sys
+
 from lexer import *
 
 import regexpr
@@ -34,6 +36,8 @@ class LexerGenerator:
     
     The print_dfa function outputs Python code defining the transition table of the lexer
     DFA as well as the DFA's initial state. These can be used to create a Lexer object.
+    The transition table is a flat tuple, where the transition from state s on byte c is
+    found at index s * 256 + c, and -1 marks a missing transition.
     """
 
     def __init__(self, tokens):
@@ -57,39 +61,45 @@ class LexerGenerator:
         """
         dfa = self.dfa
 
-        sink_states = set()
-        for state in range(0, len(dfa.transitions)):
-            if dfa.is_sink_state(state):
-                sink_states.add(state)
+        sink_states = dfa.get_sink_states()
+
+        # The code is accumulated and written out in one go, as the table may span many lines.
+        lines = []
         
-        print('======== BEGIN CODE ========')
-        print('{} = {}\n'.format(initial_state, dfa.initial_state))
-        print('{} = {{'.format(transitions))
-        for state in range(0, len(dfa.transitions)):
-            if state in sink_states:
-                continue
-            for c in range(0, regexpr.NUM_CHARS):
-                next_state = dfa.transitions[state][c]
-                if next_state in sink_states:
-                    continue
-                print('    {}:{},'.format((state, c), next_state))
-        print('}\n')
-
-        print('{} = {{'.format(outputs))
+        lines.append('======== BEGIN CODE ========\n')
+        lines.append('{} = {}\n\n'.format(initial_state, dfa.initial_state))
+        lines.append('{} = (\n'.format(transitions))
+        for state in range(0, dfa.num_states):
+            # Transitions from or to sink states are omitted (i.e. set to -1).
+            row = [-1] * regexpr.NUM_CHARS
+            if state not in sink_states:
+                offset = state * regexpr.NUM_CHARS
+                for c in range(0, regexpr.NUM_CHARS):
+                    next_state = dfa.transitions[offset + c]
+                    if next_state not in sink_states:
+                        row[c] = next_state
+            lines.append('    # State {}\n'.format(state))
+            for c in range(0, regexpr.NUM_CHARS, 16):
+                lines.append('    {}\n'.format(' '.join(map('{},'.format, row[c:c + 16]))))
+        lines.append(')\n\n')
+
+        lines.append('{} = {{\n'.format(outputs))
         num_conflicts = 0
-        for state, terminals in dfa.outputs.items():
+        for state, terminals in sorted(dfa.outputs.items()):
             if len(terminals) > 1:
                 num_conflicts += 1
-                print('\n    # OUTPUT CONFLICT')
-                for terminal in terminals:
-                    print('    {}:{},'.format(state, terminal))
-                print()
+                lines.append('\n    # OUTPUT CONFLICT\n')
+                for terminal in sorted(terminals):
+                    lines.append('    {}:{},\n'.format(state, terminal))
+                lines.append('\n')
             else:
-                terminal = terminals.pop()
-                print('    {}:{},'.format(state, terminal))
-        print('}')
-        print('======== END CODE ========')
-        print('{} conflict(s) detected.'.format(num_conflicts))
+                terminal, = terminals
+                lines.append('    {}:{},\n'.format(state, terminal))
+        lines.append('}\n')
+        lines.append('======== END CODE ========\n')
+        lines.append('{} conflict(s) detected.\n'.format(num_conflicts))
+
+        sys.stdout.write(''.join(lines))
     
     def compute_dfa(self):
         """
@@ -99,7 +109,7 @@ class LexerGenerator:
         """
         dfa = self.get_whitespace_dfa()
         for terminal, expr in self.tokens:
-            dfa = dfa.union(self.parser.parse(expr, terminal))
+            dfa = dfa.union(regexpr.compile_regex(expr, terminal))
         return dfa.minimize()
     
     def get_whitespace_dfa(self):
@@ -109,4 +119,4 @@ class LexerGenerator:
 
         :return A DFA recognising whitespace characters.
         """
-        return self.parser.parse(r'[ \n\t]+', WHITESPACE)
+        return regexpr.compile_regex(r'[ \n\t]+', WHITESPACE)
@@ -7,6 +7,8 @@ Parser functionality.
 __author__ = 'johnrickE'
 
 
+from itertools import chain
+
 # Reserved grammar symbols
 NIL = -2 # ε  terminal indicating an empty production
 END = -1 # $  terminal indicating end-of-input
@@ -20,6 +22,12 @@ ACCEPT = 2
 # It is included here anyways for implementation-specific reasons.
 GOTO = 3
 
+# Each entry of the ACTION table packs a parser action together with its data (the next state for
+# SHIFT, or the reduction info position for REDUCE and ACCEPT) as (data << ACTION_BITS) | action.
+# Entries set to -1 indicate that no action exists.
+ACTION_BITS = 2
+ACTION_MASK = (1 << ACTION_BITS) - 1
+
 
 class TerminalSet:
     """
@@ -94,9 +102,15 @@ class Parser:
     This class allows users to traverse the parse tree as it is being constructed, via the use of
     reduction callbacks. A reduction callback is a function assigned to each production rule.
     When the parser reduces a string of symbols to a single non-terminal symbol under a certain
-    production rule, the reduction callback for that rule gets called. The callback takes in a
-    list of 'terms' that correspond to the symbols being reduced, and returns a term representing
-    the new non-terminal (the LHS symbol of the production).
+    production rule, the reduction callback for that rule gets called. The callback is called as
+    callback(stack, top, context), where the 'terms' that correspond to the n symbols being reduced
+    are stack[top - n] to stack[top - 1], in left-to-right order. It returns a term representing the
+    new non-terminal (the LHS symbol of the production). Callbacks read the terms directly from the
+    parser's stack, and must not modify it.
+
+    A rule that simply passes one of its terms through may use an integer k as its callback instead
+    of a function. The parser then uses the k-th term (counting from 0) as the new term directly,
+    without making a function call.
 
     If a symbol is a terminal, then the term corresponding to that symbol is the token value returned
     by the lexer. If a symbol is a non-terminal, then the term is whatever was returned by a reduction
@@ -111,16 +125,25 @@ class Parser:
     is reached. An instance of this class can then be passed to the Parser object.
     """
 
-    def __init__(self, table, reductions, lexer_factory, context_factory):
+    def __init__(self, actions, gotos, reductions, lexer_factory, context_factory):
         """
         Constructs a new Parser object.
 
-        :param table        An LR(1) parsing table. This should be generated by the parsergen.ParserGenerator class.
+        :param actions      The LR(1) ACTION table. This should be generated by the parsergen.ParserGenerator class.
+        :param gotos        The LR(1) GOTO table. This should be generated by the parsergen.ParserGenerator class.
         :param reductions   A reduction lookup buffer. This This should be generated by the parsergen.ParserGenerator class.
         :lexer_factory      A lambda that wraps input in a 'lexer' class.
         :context_factory    A lambda that returns some user-defined data to be used in reduction callbacks.
         """
-        self.table = table
+        # The rows of both tables are concatenated into single flat tables, so that each lookup
+        # is a single index operation rather than a row lookup followed by an entry lookup.
+        self.action_stride = len(actions[0])
+        self.goto_stride = len(gotos[0])
+        # Every row must have the same width, or lookups would read entries from neighbouring rows.
+        if any(len(row) != self.action_stride for row in actions) or any(len(row) != self.goto_stride for row in gotos):
+            raise ParserError('Invalid table - rows have different lengths')
+        self.actions = tuple(chain.from_iterable(actions))
+        self.gotos = tuple(chain.from_iterable(gotos))
         self.reductions = reductions
         self.lexer_factory = lexer_factory
         self.context_factory = context_factory
@@ -135,46 +158,55 @@ class Parser:
         :return The result of the reduction callback for the goal production rule.
         """
 
-        table = self.table
+        actions = self.actions
+        gotos = self.gotos
+        action_stride = self.action_stride
+        goto_stride = self.goto_stride
         reductions = self.reductions
 
         lexer = self.lexer_factory(source)
         context = self.context_factory(user_data)
-        stack = [0]
+        # The parser states and the terms of the symbols between them are kept in separate stacks.
+        states = [0]
+        stack = []
         lexeme, token = lexer.lex()
+        if not -action_stride <= lexeme < 0: # Only terminals index into an ACTION row.
+            raise ParserError('Invalid input')
         while True:
-            position = (stack[-1], lexeme)
-            if position not in table:
+            # ACTION rows are indexed by the (negative) terminal symbol from the end of the row.
+            entry = actions[(states[-1] + 1) * action_stride + lexeme]
+            if entry < 0:
                 raise ParserError('Invalid input')
-            action, index = table[position]
+            action = entry & ACTION_MASK
+            index = entry >> ACTION_BITS
             if action == SHIFT:
                 stack.append(token)
-                stack.append(index) # index = next state
+                states.append(index) # index = next state
                 lexeme, token = lexer.lex()
+                if not -action_stride <= lexeme < 0:
+                    raise ParserError('Invalid input')
             elif action == REDUCE:
                 # Reduction info contains:
                 # - LHS symbol of the production
                 # - Number of terms in RHS of the production
                 # - The reduction callback
                 lhs, n, callback = reductions[index] # index = reduction info position
-                terms = []
-                for _ in range(0, n):
-                    stack.pop()
-                    terms.append(stack.pop())
-                # Terms were pushed in left-to-right order and popped in
-                # right-to-left order, so we reverse the list to get the original
-                # order.
-                terms.reverse()
-                node = callback(terms, context)
-                position = (stack[-1], lhs)
-                if position not in table:
+                top = len(stack)
+                if type(callback) is int: # Copy rule, see the class docstring.
+                    node = stack[top - n + callback]
+                else:
+                    node = callback(stack, top, context)
+                del stack[top - n:]
+                del states[len(states) - n:]
+                next_state = gotos[states[-1] * goto_stride + lhs]
+                if next_state < 0:
                     raise ParserError('Invalid table - GOTO entry not found')
-                _, next_state = table[position]
                 stack.append(node)
-                stack.append(next_state)
+                states.append(next_state)
             elif action == ACCEPT:
-                _, _, callback = reductions[0]
-                stack.pop()
-                return callback([stack.pop()], context)
+                _, n, callback = reductions[0]
+                if type(callback) is int:
+                    return stack[len(stack) - n + callback]
+                return callback(stack, len(stack), context)
             else:
                 raise ParserError('Invalid table - unknown action found')
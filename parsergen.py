@@ -7,6 +7,8 @@ Parser generation functionality.
 __author__ = 'johnrickE'
 
 
+import sys
+
 from collections import defaultdict
 
 from dataclasses import dataclass
@@ -28,49 +30,13 @@ class Production:
     rhs: tuple[int, ...]
 
 
-@dataclass(frozen=True)
-class Item:
-    """
-    An LR(1) item of the general form [A -> X . Y, a] where X and Y are strings
-    of terminals and non-terminals (or empty strings).
-
-    :param rule         The production rule 'A -> X Y'.
-    :param cursor       The '.' position within the RHS of the rule.
-    :param lookahead    The terminal symbol 'a'.
-    """
-    rule: Production
-    cursor: int
-    lookahead: int
+# FIRST sets are represented as bitsets, where bit -t is set if the terminal t is in the set.
+NIL_BIT = 1 << -NIL
 
-    def has_successor(self):
-        """
-        Checks if the cursor position has not reached the end of the RHS of the
-        production rule, i.e. the item is not of the form [A -> X ., a].
 
-        :return True if the cursor is not at the end of the rule RHS; False otherwise.
-        """
-        return self.cursor < len(self.rule.rhs)
-    
-    def get_successor(self):
-        """
-        Returns an item identical to this item with the cursor position shifted one
-        place to the right. In other words, given that this item is of the form
-        [A -> X . B Y, a], returns the item [A -> X B . Y, a], where B is a terminal
-        or non-terminal symbol.
-
-        :return A copy of this item with the cursor incremented by 1.
-        """
-        return Item(self.rule, self.cursor + 1, self.lookahead)
-    
-    def get_locus(self):
-        """
-        Returns the symbol adjacent to the cursor. Given that this item is of the
-        form [A -> X . B Y, a], returns the symbol B, where B is a terminal or
-        non-terminal symbol.
-
-        :return The symbol at the cursor position within the RHS of the rule.
-        """
-        return self.rule.rhs[self.cursor]
+# LR(1) items of the general form [A -> X . Y, a] are represented as tuples of the form
+# (rule index, cursor, lookahead), where the cursor is the '.' position within the RHS of
+# the rule 'A -> X Y', and the lookahead is the terminal symbol 'a'.
 
 
 class ParserGenerator:
@@ -88,24 +54,24 @@ class ParserGenerator:
     1. Create reduction callbacks for each production rule.
         # Example reduction callbacks that construct an abstract syntax tree.
 
-        def r0(terms, _): # S' -> S
-            return terms[0]
+        def r0(stack, top, _): # S' -> S
+            return stack[top - 1]
         
-        def r1(terms, _): # S -> C C
+        def r1(stack, top, _): # S -> C C
             node = AST()
-            node.add_child(terms[0])
-            node.add_child(terms[1])
+            node.add_child(stack[top - 2])
+            node.add_child(stack[top - 1])
             return node
 
-        def r2(terms, _): # C -> c C
+        def r2(stack, top, _): # C -> c C
             node = AST()
-            node.add_child(terms[0])
-            node.add_child(terms[1])
+            node.add_child(stack[top - 2])
+            node.add_child(stack[top - 1])
             return node
         
-        def r3(terms, _): # C -> d
+        def r3(stack, top, _): # C -> d
             node = AST()
-            node.add_child(terms[0])
+            node.add_child(stack[top - 1])
             return node
 
     2. Create an instance of TerminalSet and NonTerminalSet
@@ -126,12 +92,15 @@ class ParserGenerator:
             (C, [d], r3)     # C  -> d
         ]
 
+        A rule that only passes one of its terms through may use the index of that term instead
+        of a callback, e.g. (GOAL, [S], 0) rather than (GOAL, [S], r0).
+
     5. Print the parsing table.
         generator = ParserGenerator(TERMINALS, NONTERMINALS, RULES)
         generator.print_table()
     
-    The print_table function outputs Python code which defines the parsing table as
-    well as a 'reduction lookup buffer'. These can then be used to construct a
+    The print_table function outputs Python code which defines the ACTION and GOTO tables
+    as well as a 'reduction lookup buffer'. These can then be used to construct a
     Parser object. This function also detects any parsing conflicts (i.e. shift/reduce or
     reduce/reduce conflicts).
     """
@@ -152,46 +121,92 @@ class ParserGenerator:
         for i in range(0, len(rules)):
             lhs, rhs, callback = rules[i]
             self.rules.append(Production(i, lhs, tuple(rhs)))
-            self.callbacks.append((lhs, len(rhs), callback.__name__))
+            self.callbacks.append((lhs, len(rhs), callback if type(callback) is int else callback.__name__))
+        # Production rules grouped by their LHS non-terminal.
+        self.rules_by_lhs = defaultdict(list)
+        for rule in self.rules:
+            self.rules_by_lhs[rule.lhs].append(rule)
+        # The symbol adjacent to each cursor position of each rule (None at the end of the RHS),
+        # and the string of symbols following that symbol.
+        self.loci = [rule.rhs + (None,) for rule in self.rules]
+        self.suffixes = [[rule.rhs[cursor + 1:] for cursor in range(0, len(rule.rhs))] for rule in self.rules]
+        # Memoized FIRST sets of the strings that follow each cursor position.
+        self.first_of_suffix = dict()
         self.first = self.compute_first_map()
         self.table = self.generate()
     
-    def print_table(self, table='TABLE', reductions='REDUCTIONS'):
+    def print_table(self, actions='ACTIONS', gotos='GOTOS', reductions='REDUCTIONS'):
         """
-        Prints Python code defining the parsing table and reduction lookup buffer.
+        Prints Python code defining the ACTION and GOTO tables and reduction lookup buffer.
         
-        :param table        The variable name of the parsing table.
+        :param actions      The variable name of the ACTION table.
+        :param gotos        The variable name of the GOTO table.
         :param reductions   The variable name of the reduction lookup buffer.
         """
+
+        action_rows, goto_rows, conflicts = self.flatten_table()
+        num_entries = sum(len(entries) for entries in self.table.values())
+
+        lines = []
         
-        print('======== BEGIN CODE ========')
-        print('# Automatically generated parsing table')
-        print('{} = {{'.format(table))
-        conflicts = False
-        num_entries = 0
-        for position, actions in self.table.items():
-            num_entries += len(actions)
-            if len(actions) > 1:
-                conflicts = True
-                print('\n    # PARSING CONFLICT')
-                for action in actions:
-                    print('    {}: {}'.format(position, action))
-                print()
-            else:
-                print('    {}: {},'.format(position, actions.pop()))
-        print('}\n')
-        print('# Automatically generated reduction lookup buffer')
-        print('{} = ['.format(reductions))
+        lines.append('======== BEGIN CODE ========\n')
+        for position, entries in conflicts:
+            lines.append('# PARSING CONFLICT: {} {}\n'.format(position, sorted(entries)))
+        lines.append('# Automatically generated parsing table\n')
+        lines.append('{} = (\n'.format(actions))
+        for row in action_rows:
+            lines.append('    {},\n'.format(repr(tuple(row)))) # repr keeps one-entry rows as tuples.
+        lines.append(')\n\n')
+        lines.append('{} = (\n'.format(gotos))
+        for row in goto_rows:
+            lines.append('    {},\n'.format(repr(tuple(row))))
+        lines.append(')\n\n')
+        lines.append('# Automatically generated reduction lookup buffer\n')
+        lines.append('{} = (\n'.format(reductions))
         for callback in self.callbacks:
             lhs, n, name = callback
-            print('    ({},{},{}),'.format(lhs, n, name))
-        print(']')
-        print('======== END CODE ========')
-        print('Parsing table contains {} entries'.format(num_entries))
-        if conflicts:
-            print('WARNING: Parsing conflicts were detected')
+            lines.append('    ({},{},{}),\n'.format(lhs, n, name))
+        lines.append(')\n')
+        lines.append('======== END CODE ========\n')
+        lines.append('Parsing table contains {} entries\n'.format(num_entries))
+        if len(conflicts) > 0:
+            lines.append('WARNING: Parsing conflicts were detected\n')
         else:
-            print('No conflicts detected')
+            lines.append('No conflicts detected\n')
+
+        sys.stdout.write(''.join(lines))
+
+    def flatten_table(self):
+        """
+        Converts the parsing table into dense ACTION and GOTO tables containing one row per state.
+        ACTION rows are indexed directly by terminal symbols (which are negative, so END is the last
+        entry of each row) and contain packed actions as described in the parser module. GOTO rows
+        are indexed by non-terminal symbols and contain the next state. Missing entries are set to -1.
+
+        Each position in the dense tables holds a single action, so where the parsing table contains
+        a conflict, only the smallest of the conflicting actions is kept.
+
+        :return A tuple containing the ACTION rows, the GOTO rows, and a list of conflicting
+                (position, actions) pairs.
+        """
+        table = self.table
+
+        num_states = 1 + max(state for state, _ in table)
+        action_rows = [[-1] * len(self.terminals) for _ in range(0, num_states)]
+        goto_rows = [[-1] * len(self.non_terminals) for _ in range(0, num_states)]
+        conflicts = []
+
+        for position, entries in sorted(table.items()):
+            state, symbol = position
+            if len(entries) > 1:
+                conflicts.append((position, entries))
+            action, data = min(entries)
+            if action == GOTO:
+                goto_rows[state][symbol] = data
+            else:
+                action_rows[state][symbol] = (data << ACTION_BITS) | action
+
+        return action_rows, goto_rows, conflicts
     
     def simplify_table(self, table, initial_state):
         """
@@ -237,14 +252,18 @@ class ParserGenerator:
         """
 
         rules = self.rules
+        loci = self.loci
         closure = self.closure
         terminals = self.terminals
 
         table = defaultdict(set)
         explored = set()
         frontier = []
+        # Maps each kernel seen so far to its closure. Equal kernels then share a single state
+        # object, whose hash is computed once and which later lookups match by identity.
+        states = dict()
 
-        initial_state = closure([Item(rules[0], 0, END)])
+        initial_state = closure([(0, 0, END)])
         frontier.append(initial_state)
 
         while len(frontier) > 0:
@@ -256,13 +275,17 @@ class ParserGenerator:
             # Maps symbols to a configurating set of LR(1) items (or kernel).
             # The closure of each kernel gives the next state.
             transitions = defaultdict(list)
-            for item in state:
-                if item.has_successor():
-                    transitions[item.get_locus()].append(item.get_successor())
+            for index, cursor, lookahead in state:
+                symbol = loci[index][cursor]
+                if symbol is not None:
+                    transitions[symbol].append((index, cursor + 1, lookahead))
                 else:
-                    table[(state, item.lookahead)].add((ACCEPT if item.rule.lhs == GOAL else REDUCE, item.rule.index))
+                    table[(state, lookahead)].add((ACCEPT if rules[index].lhs == GOAL else REDUCE, index))
             for symbol, kernel in transitions.items():
-                next_state = closure(kernel)
+                key = frozenset(kernel)
+                if key not in states:
+                    states[key] = closure(kernel)
+                next_state = states[key]
                 frontier.append(next_state)
                 table[(state, symbol)].add((SHIFT if symbol in terminals else GOTO, next_state))
         
@@ -274,14 +297,15 @@ class ParserGenerator:
         Computes the LR(1) closure for a given configurating set of LR(1) items (i.e. a kernel).
         Note that the kernel will be empty when this function returns.
 
-        :param kernel   The configurating set, represented as a list of Item objects.
+        :param kernel   The configurating set, represented as a list of LR(1) items.
 
-        :return The LR(1) closure of the given kernel, as a frozenset of Item objects.
+        :return The LR(1) closure of the given kernel, as a frozenset of LR(1) items.
         """
 
-        rules = self.rules
-        first = self.first
-        terminals = self.terminals
+        loci = self.loci
+        suffixes = self.suffixes
+        rules_by_lhs = self.rules_by_lhs
+        get_first_of_string = self.get_first_of_string
         non_terminals = self.non_terminals
 
         state = set()
@@ -291,83 +315,109 @@ class ParserGenerator:
             if item in state:
                 continue
             state.add(item)
-            if not item.has_successor():
-                continue
-            non_terminal = item.get_locus()
-            if non_terminal not in non_terminals:
+            index, cursor, lookahead = item
+            non_terminal = loci[index][cursor]
+            if non_terminal is None or non_terminal not in non_terminals:
                 continue
 
-            item = item.get_successor()
             # The FOLLOW set of an LR(1) item [A -> X . B Y, a] contains all the terminals that
-            # may appear directly after the symbol B.
-            follow = set()
-            empty = True
-            while item.has_successor():
-                symbol = item.get_locus()
-                if symbol in terminals:
-                    follow.add(symbol)
-                    empty = False
-                    break
-                nil_not_found = True
-                for terminal in first[symbol]:
-                    if terminal == NIL:
-                        nil_not_found = False
-                    else:
-                        follow.add(terminal)
-                if nil_not_found:
-                    empty = False
-                    break
-                item = item.get_successor()
+            # may appear directly after the symbol B, i.e. FIRST(Y a).
+            follow, empty = get_first_of_string(suffixes[index][cursor])
             if empty:
-                follow.add(item.lookahead)
+                follow = follow.union([lookahead])
             
-            for rule in rules:
-                if rule.lhs != non_terminal:
-                    continue
+            for rule in rules_by_lhs[non_terminal]:
                 for symbol in follow:
-                    kernel.append(Item(rule, 0, symbol))
+                    kernel.append((rule.index, 0, symbol))
 
         return frozenset(state)
+
+    def get_first_of_string(self, symbols):
+        """
+        Computes the FIRST set of a string of symbols, excluding ε. Results are memoized,
+        since the same rule suffixes recur across items that differ only in their lookahead.
+        This function assumes that the FIRST sets have already been computed.
+
+        :param symbols  A tuple of terminals and non-terminals.
+
+        :return A tuple containing the FIRST set of the string (without ε) as a frozenset, and
+                True if the string can derive the empty string; False otherwise.
+        """
+        if symbols in self.first_of_suffix:
+            return self.first_of_suffix[symbols]
+
+        first = self.first
+        terminals = self.terminals
+
+        bits = 0
+        empty = True
+        for symbol in symbols:
+            if symbol in terminals:
+                bits |= 1 << -symbol
+                empty = False
+                break
+            bits |= first[symbol] & ~NIL_BIT
+            if first[symbol] & NIL_BIT == 0:
+                empty = False
+                break
+
+        follow = []
+        while bits != 0:
+            bit = bits & -bits
+            follow.append(1 - bit.bit_length())
+            bits ^= bit
+
+        result = self.first_of_suffix[symbols] = frozenset(follow), empty
+        return result
     
     def compute_first_map(self):
         """
         Computes the FIRST set of each non-terminal in the grammar.
 
-        :return A list of sets representing the FIRST set of each non-terminal.
+        :return A list of bitsets representing the FIRST set of each non-terminal, where
+                bit -t is set if the terminal t is in the set.
         """
         terminals = self.terminals
         non_terminals = self.non_terminals
         rules = self.rules
 
-        first = [set() for _ in range(0, len(non_terminals))]
-        changed = True
+        first = [0] * len(non_terminals)
 
-        def insert(non_terminal, terminal):
-            nonlocal first, changed
-            if terminal not in first[non_terminal]:
-                first[non_terminal].add(terminal)
-                changed = True
-        
-        while changed:
-            changed = False
-            for rule in rules:
-                non_terminal = rule.lhs
-                empty = True
-                for symbol in rule.rhs:
-                    if symbol in terminals:
-                        insert(non_terminal, symbol)
-                        empty = False
-                        break
-                    nil_not_found = True
-                    for terminal in first[symbol]:
-                        if terminal == NIL:
-                            nil_not_found = False
-                        else:
-                            insert(non_terminal, terminal)
-                    if nil_not_found:
-                        empty = False
-                        break
-                if empty:
-                    insert(non_terminal, NIL)
+        # Maps each non-terminal to the rules whose FIRST contribution may change when the
+        # FIRST set of that non-terminal grows, i.e. the rules where it appears before any
+        # terminal in the RHS.
+        dependents = defaultdict(list)
+        for rule in rules:
+            for symbol in rule.rhs:
+                if symbol in terminals:
+                    break
+                dependents[symbol].append(rule)
+
+        worklist = list(rules)
+        queued = [True] * len(rules)
+
+        while len(worklist) > 0:
+            rule = worklist.pop()
+            queued[rule.index] = False
+            non_terminal = rule.lhs
+            bits = first[non_terminal]
+            empty = True
+            for symbol in rule.rhs:
+                if symbol in terminals:
+                    bits |= 1 << -symbol
+                    empty = False
+                    break
+                bits |= first[symbol] & ~NIL_BIT
+                if first[symbol] & NIL_BIT == 0:
+                    empty = False
+                    break
+            if empty:
+                bits |= NIL_BIT
+            if bits != first[non_terminal]:
+                first[non_terminal] = bits
+                for dependent in dependents[non_terminal]:
+                    if not queued[dependent.index]:
+                        queued[dependent.index] = True
+                        worklist.append(dependent)
         
         return first
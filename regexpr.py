@@ -7,6 +7,8 @@ ComPyLR-RegEx to DFA conversion.
 __author__ = 'johnrickE'
 
 
+from functools import lru_cache
+
 from fsa import *
 
 from parser import *
@@ -50,21 +52,25 @@ CharacterRange -> 'CHAR'
 """ Reduction Callbacks """
 
 
-def accept(terms, context): # S' -> Disjunction
+# Rules that only pass one of their terms through (r2, r4, r5, r10, r13 and r15) have no callback
+# function, and instead use the index of that term as their callback (see the parser.Parser class).
+
+
+def accept(stack, top, context): # S' -> Disjunction
     # Full RegEx has been transformed to an ε-NFA.
-    # Now set the initial and final state, and convert the ε-NFA to a DFA.
+    # Now set the initial and final state, convert the ε-NFA directly to a DFA, and minimize it.
     nfa, output = context
-    q0, q1 = terms[0]
+    q0, q1 = stack[top - 1]
     nfa.initial_state = q0
-    nfa.outputs[q1] = {output}
-    return nfa.remove_epsilons().get_dfa()
+    nfa.outputs[q1] = frozenset([output])
+    return nfa.get_dfa().minimize()
 
 
-def r1(terms, context): # Disjunction -> Disjunction '|' Concatenation
+def r1(stack, top, context): # Disjunction -> Disjunction '|' Concatenation
     # Apply 'a|b' transformation from Thompson's construction.
     nfa, _ = context
-    qa, qb = terms[0]
-    qc, qd = terms[2]
+    qa, qb = stack[top - 3]
+    qc, qd = stack[top - 1]
     q0 = nfa.add_state()
     q1 = nfa.add_state()
     nfa.add_transition(q0, qa, EPSILON)
@@ -74,31 +80,19 @@ def r1(terms, context): # Disjunction -> Disjunction '|' Concatenation
     return q0, q1
 
 
-def r2(terms, _): # Disjunction -> Concatenation
-    return terms[0]
-
-
-def r3(terms, context): # Concatenation -> Concatenation Quantifier
+def r3(stack, top, context): # Concatenation -> Concatenation Quantifier
     # Apply 'ab' transformation from Thompson's construction.
     nfa, _ = context
-    qa, qb = terms[0]
-    qc, qd = terms[1]
+    qa, qb = stack[top - 2]
+    qc, qd = stack[top - 1]
     nfa.add_transition(qb, qc, EPSILON)
     return qa, qd
 
 
-def r4(terms, _): # Concatenation -> Quantifier
-    return terms[0]
-
-
-def r5(terms, _): # Quantifier -> Factor
-    return terms[0]
-
-
-def r6(terms, context): # Quantifier -> Factor '*'
+def r6(stack, top, context): # Quantifier -> Factor '*'
     # Apply 'a*' transformation from Thompson's construction.
     nfa, _ = context
-    qa, qb = terms[0]
+    qa, qb = stack[top - 2]
     q0 = nfa.add_state()
     q1 = nfa.add_state()
     nfa.add_transition(q0, q1, EPSILON)
@@ -108,10 +102,10 @@ def r6(terms, context): # Quantifier -> Factor '*'
     return q0, q1
 
 
-def r7(terms, context): # Quantifier -> Factor '+'
+def r7(stack, top, context): # Quantifier -> Factor '+'
     # Apply 'a+' transformation from Thompson's construction.
     nfa, _ = context
-    qa, qb = terms[0]
+    qa, qb = stack[top - 2]
     q0 = nfa.add_state()
     q1 = nfa.add_state()
     nfa.add_transition(q0, qa, EPSILON)
@@ -120,10 +114,10 @@ def r7(terms, context): # Quantifier -> Factor '+'
     return q0, q1
 
 
-def r8(terms, context): # Quantifier -> Factor '?'
+def r8(stack, top, context): # Quantifier -> Factor '?'
     # Apply 'a?' transformation from Thompson's construction.
     nfa, _ = context
-    qa, qb = terms[0]
+    qa, qb = stack[top - 2]
     q0 = nfa.add_state()
     q1 = nfa.add_state()
     nfa.add_transition(q0, qa, EPSILON)
@@ -132,112 +126,157 @@ def r8(terms, context): # Quantifier -> Factor '?'
     return q0, q1
 
 
-def r9(terms, context): # Factor -> 'CHAR'
+def r9(stack, top, context): # Factor -> 'CHAR'
     # Apply terminal transformation from Thompson's construction.
     nfa, _ = context
     q0 = nfa.add_state()
     q1 = nfa.add_state()
-    nfa.add_transition(q0, q1, terms[0])
+    nfa.add_transition(q0, q1, stack[top - 1])
     return q0, q1
 
 
-def r10(terms, _): # Factor -> '(' Disjunction ')'
-    return terms[1]
-
-
-def r11(terms, context): # Factor -> '[' Class ']'
+def r11(stack, top, context): # Factor -> '[' Class ']'
     # Apply terminal transformation from Thompson's construction for all symbols in the character class.
     nfa, _ = context
     q0 = nfa.add_state()
     q1 = nfa.add_state()
-    for c in terms[1]:
-        nfa.add_transition(q0, q1, c)
+    for first, last in stack[top - 2]:
+        nfa.add_transition_range(q0, q1, first, last)
     return q0, q1
 
 
-def r12(terms, _): # Class -> HalfClass '^' HalfClass
-    return terms[0].difference(terms[2])
+def r12(stack, top, _): # Class -> HalfClass '^' HalfClass
+    return interval_difference(stack[top - 3], stack[top - 1])
 
 
-def r13(terms, _): # Class -> HalfClass
-    return terms[0]
+def r14(stack, top, _): # HalfClass -> HalfClass CharacterRange
+    intervals = stack[top - 2]
+    intervals.extend(stack[top - 1])
+    return intervals
 
 
-def r14(terms, _): # HalfClass -> HalfClass CharacterRange
-    chars = terms[0]
-    chars.update(terms[1])
-    return chars
+def r16(stack, top, _): # CharacterRange -> 'CHAR' '-' 'CHAR'
+    return [(stack[top - 3], stack[top - 1])]
 
 
-def r15(terms, _): # HalfClass -> CharacterRange
-    return terms[0]
+def r17(stack, top, _): # CharacterRange -> 'CHAR'
+    return [(stack[top - 1], stack[top - 1])]
 
 
-def r16(terms, _): # CharacterRange -> 'CHAR' '-' 'CHAR'
-    return set([c for c in range(terms[0], 1 + terms[2])])
+""" Character Classes """
 
 
-def r17(terms, _): # CharacterRange -> 'CHAR'
-    return set([terms[0]])
+# Character classes are represented as lists of inclusive (first, last) codepoint intervals,
+# rather than as sets of individual codepoints.
+
+
+def interval_difference(lhs, rhs):
+    """
+    Computes the set difference of two character classes.
+
+    :param lhs  The list of intervals to subtract from.
+    :param rhs  The list of intervals to subtract.
+
+    :return A list of intervals containing exactly the codepoints in lhs that are not in rhs.
+    """
+    difference = []
+    rhs = sorted(rhs)
+    start = 0
+    # Both lists are walked in lockstep. Intervals of rhs that end before the current interval
+    # of lhs also end before all of the following ones, so they are never visited again.
+    for first, last in sorted(lhs):
+        while start < len(rhs) and rhs[start][1] < first:
+            start += 1
+        index = start
+        while index < len(rhs) and rhs[index][0] <= last:
+            rhs_first, rhs_last = rhs[index]
+            index += 1
+            if rhs_last < first:
+                continue
+            if rhs_first > first:
+                difference.append((first, rhs_first - 1))
+            first = rhs_last + 1
+            if first > last:
+                break
+        if first <= last:
+            difference.append((first, last))
+    return difference
 
 
 """ Terminal Symbols + Lexer Code """
 
 
-TERMINALS = TerminalSet()
-
-BAR = TERMINALS.add()
-ASTERISK = TERMINALS.add()
-PLUS = TERMINALS.add()
-QUESTION = TERMINALS.add()
-CHAR = TERMINALS.add()
-LPAREN = TERMINALS.add()
-RPAREN = TERMINALS.add()
-LSQUARE = TERMINALS.add()
-RSQUARE = TERMINALS.add()
-CARET = TERMINALS.add()
-HYPHEN = TERMINALS.add()
-
-
-# These characters must be escaped by '\' in order to be interpreted as normal characters.
-SPECIAL_CHARS = {
-    '|': BAR,
-    '*': ASTERISK,
-    '+': PLUS,
-    '?': QUESTION,
-    '(': LPAREN,
-    ')': RPAREN,
-    '[': LSQUARE,
-    ']': RSQUARE,
-    '^': CARET,
-    '-': HYPHEN
-}
+# Terminal symbols are fixed constants, matching the order in which they are added to the
+# TerminalSet used to generate the parsing table (after END and NIL).
+BAR = -3
+ASTERISK = -4
+PLUS = -5
+QUESTION = -6
+CHAR = -7
+LPAREN = -8
+RPAREN = -9
+LSQUARE = -10
+RSQUARE = -11
+CARET = -12
+HYPHEN = -13
+
+
+# Terminal symbol of each unescaped character, indexed by codepoint.
+# Special characters must be escaped by '\' in order to be interpreted as normal characters.
+SPECIAL_CHARS = [CHAR] * NUM_CHARS
+SPECIAL_CHARS[ord('|')] = BAR
+SPECIAL_CHARS[ord('*')] = ASTERISK
+SPECIAL_CHARS[ord('+')] = PLUS
+SPECIAL_CHARS[ord('?')] = QUESTION
+SPECIAL_CHARS[ord('(')] = LPAREN
+SPECIAL_CHARS[ord(')')] = RPAREN
+SPECIAL_CHARS[ord('[')] = LSQUARE
+SPECIAL_CHARS[ord(']')] = RSQUARE
+SPECIAL_CHARS[ord('^')] = CARET
+SPECIAL_CHARS[ord('-')] = HYPHEN
 
 HEXADECIMAL_CHARS = '0123456789abcdefABCDEF'
 
 
-def get_codepoint(c: str):
-    """
-    Gets the codepoint of the specified character. This function also handles escaped characters.
+# Codepoints of escaped characters with a special meaning, keyed by the codepoint of the escaped
+# character. Any other escaped character (except for 'x', which starts a hexadecimal escape)
+# stands for itself.
+ESCAPE_CODEPOINTS = {
+    ord('n'): ord('\n'),
+    ord('t'): ord('\t')
+}
+
 
-    :param c    A character returned by the lexer.
+# The lexer is driven by a transition table with one row of bytes per automaton state, indexed
+# by codepoint. Codepoints beyond the last column behave exactly like it (they are neither '\',
+# 'x' nor hexadecimal digits), so they share that column. Entries below LEX_ERROR are next states.
+LEX_ERROR = 254 # The character is invalid in this state.
+LEX_DONE = 255  # The character is the last one of the token.
 
-    :return The codepoint of character c.
+
+def build_lex_table():
     """
-    if c == '\\n':
-        return ord('\n')
-    if c == '\\t':
-        return ord('\t')
-    if c.startswith('\\x'):
-        return int('0x' + c[2:], base=16)
-    if c.startswith('\\'):
-        return ord(c[1])
-    return ord(c[0])
+    Builds the transition table of the ComPyLR-RegEx lexer's automaton.
+
+    :return A tuple of transition rows, one bytes object per state.
+    """
+    table = [bytearray([LEX_DONE]) * NUM_CHARS for _ in range(0, 4)]
+    table[0][ord('\\')] = 1 # State 0: start of a token.
+    table[1][ord('x')] = 2  # State 1: after '\'.
+    table[2][:] = bytes([LEX_ERROR]) * NUM_CHARS # State 2: after '\x'.
+    table[3][:] = bytes([LEX_ERROR]) * NUM_CHARS # State 3: after '\x' and one hexadecimal digit.
+    for c in HEXADECIMAL_CHARS:
+        table[2][ord(c)] = 3
+        table[3][ord(c)] = LEX_DONE
+    return tuple(bytes(row) for row in table)
+
+
+LEX_TABLE = build_lex_table()
 
 
 class Lexer:
     """
-    Hand-written ComPyLR-RegEx lexer that handles escaped characters.
+    Table-driven ComPyLR-RegEx lexer that handles escaped characters.
     """
 
     def __init__(self, source):
@@ -255,46 +294,37 @@ class Lexer:
 
         :return A tuple containing the terminal symbol as well as the codepoint of the character.
         """
-        if self.position >= len(self.source):
+        source = self.source
+        length = len(source)
+        position = self.position
+        if position >= length:
             return END, None
-        state = self.state0
-        prev_position = self.position
-        while state is not None:
-            state = state(self.consume())
-        value = self.source[prev_position:self.position]
-        return SPECIAL_CHARS.get(value, CHAR), get_codepoint(value)
-
-    def consume(self):
-        """
-        Consumes an input character.
-
-        :return The consumed character.
-        """
-        c = self.source[self.position]
-        self.position += 1
-        return c
-    
-    """ Each of the following member functions implement a state in the lexer's automaton. """
-
-    def state0(self, c):
-        if c == '\\':
-            return self.state1
-        return None
-
-    def state1(self, c):
-        if c == 'x':
-            return self.state2
-        return None
-
-    def state2(self, c):
-        if c in HEXADECIMAL_CHARS:
-            return self.state3
-        raise LexerError('Invalid character')
-
-    def state3(self, c):
-        if c in HEXADECIMAL_CHARS:
-            return None
-        raise LexerError('Invalid character')
+        state = 0
+        while state < LEX_ERROR:
+            if position >= length:
+                raise LexerError('Unexpected end of input')
+            c = ord(source[position])
+            position += 1
+            last_state = state
+            state = LEX_TABLE[state][c if c < NUM_CHARS else NUM_CHARS - 1]
+        if state == LEX_ERROR:
+            raise LexerError('Invalid character')
+        self.position = position
+
+        # The codepoint is decoded from the state in which the token ended, so the
+        # token's characters never have to be sliced out and scanned again.
+        if last_state == 0: # Unescaped character.
+            lexeme = SPECIAL_CHARS[c if c < NUM_CHARS else NUM_CHARS - 1]
+            codepoint = c
+        elif last_state == 1: # Escaped character.
+            lexeme = CHAR
+            codepoint = ESCAPE_CODEPOINTS.get(c, c)
+        else: # Hexadecimal escape.
+            lexeme = CHAR
+            codepoint = int(source[position - 2], base=16) * 16 + int(source[position - 1], base=16)
+        if codepoint >= NUM_CHARS: # Automata only transition on bytes.
+            raise LexerError('Invalid character')
+        return lexeme, codepoint
 
 
 """ Parser Generation Code """
@@ -304,6 +334,13 @@ if __name__ == '__main__' and print_parsing_table:
     
     from parsergen import *
 
+    TERMINALS = TerminalSet()
+
+    # The TerminalSet must produce the same symbols as the constants above.
+    for terminal in (BAR, ASTERISK, PLUS, QUESTION, CHAR, LPAREN, RPAREN, LSQUARE, RSQUARE, CARET, HYPHEN):
+        added = TERMINALS.add()
+        assert added == terminal
+
     NONTERMINALS = NonTerminalSet()
 
     Disjunction = NONTERMINALS.add()
@@ -318,25 +355,25 @@ if __name__ == '__main__' and print_parsing_table:
         (GOAL, [Disjunction], accept), # S' -> Disjunction
 
         (Disjunction, [Disjunction, BAR, Concatenation], r1),   # Disjunction -> Disjunction '|' Concatenation
-        (Disjunction, [Concatenation], r2),                     # Disjunction -> Concatenation
+        (Disjunction, [Concatenation], 0),                      # Disjunction -> Concatenation
 
         (Concatenation, [Concatenation, Quantifier], r3),   # Concatenation -> Concatenation Quantifier
-        (Concatenation, [Quantifier], r4),                  # Concatenation -> Quantifier
+        (Concatenation, [Quantifier], 0),                   # Concatenation -> Quantifier
 
-        (Quantifier, [Factor], r5),             # Quantifier -> Factor
+        (Quantifier, [Factor], 0),              # Quantifier -> Factor
         (Quantifier, [Factor, ASTERISK], r6),   # Quantifier -> Factor '*'
         (Quantifier, [Factor, PLUS], r7),       # Quantifier -> Factor '+'
         (Quantifier, [Factor, QUESTION], r8),   # Quantifier -> Factor '?'
 
         (Factor, [CHAR], r9), # Factor -> 'CHAR'
-        (Factor, [LPAREN, Disjunction, RPAREN], r10),   # Factor -> '(' Disjunction ')'
+        (Factor, [LPAREN, Disjunction, RPAREN], 1),     # Factor -> '(' Disjunction ')'
         (Factor, [LSQUARE, Class, RSQUARE], r11),       # Factor -> '[' Class ']'
 
         (Class, [HalfClass, CARET, HalfClass], r12),    # Class -> HalfClass '^' HalfClass
-        (Class, [HalfClass], r13),                      # Class -> HalfClass
+        (Class, [HalfClass], 0),                        # Class -> HalfClass
 
         (HalfClass, [HalfClass, CharacterRange], r14),  # HalfClass -> HalfClass CharacterRange
-        (HalfClass, [CharacterRange], r15),             # HalfClass -> CharacterRange
+        (HalfClass, [CharacterRange], 0),               # HalfClass -> CharacterRange
 
         (CharacterRange, [CHAR, HYPHEN, CHAR], r16),    # CharacterRange -> 'CHAR' '-' 'CHAR'
         (CharacterRange, [CHAR], r17)                   # CharacterRange -> 'CHAR'
@@ -350,264 +387,155 @@ if __name__ == '__main__' and print_parsing_table:
 
 
 # Automatically generated parsing table
-TABLE = {
-    (0, 4): (3, 1),
-    (0, 3): (3, 2),
-    (0, 1): (3, 3),
-    (0, -8): (0, 4),
-    (0, -7): (0, 5),
-    (0, -10): (0, 6),
-    (0, 2): (3, 7),
-    (7, -1): (1, 2),
-    (7, -3): (1, 2),
-    (7, 4): (3, 1),
-    (7, -8): (0, 4),
-    (7, -7): (0, 5),
-    (7, 3): (3, 8),
-    (7, -10): (0, 6),
-    (6, 7): (3, 9),
-    (6, 5): (3, 10),
-    (6, -7): (0, 11),
-    (6, 6): (3, 12),
-    (12, -11): (1, 13),
-    (12, -7): (0, 11),
-    (12, 7): (3, 13),
-    (12, -12): (0, 14),
-    (14, 7): (3, 15),
-    (14, -7): (0, 16),
-    (14, 6): (3, 17),
-    (17, -11): (1, 12),
-    (17, -7): (0, 16),
-    (17, 7): (3, 18),
-    (18, -7): (1, 14),
-    (18, -11): (1, 14),
-    (16, -11): (1, 17),
-    (16, -7): (1, 17),
-    (16, -13): (0, 19),
-    (19, -7): (0, 20),
-    (20, -11): (1, 16),
-    (20, -7): (1, 16),
-    (15, -7): (1, 15),
-    (15, -11): (1, 15),
-    (13, -7): (1, 14),
-    (13, -12): (1, 14),
-    (13, -11): (1, 14),
-    (11, -12): (1, 17),
-    (11, -7): (1, 17),
-    (11, -11): (1, 17),
-    (11, -13): (0, 21),
-    (21, -7): (0, 22),
-    (22, -11): (1, 16),
-    (22, -7): (1, 16),
-    (22, -12): (1, 16),
-    (10, -11): (0, 23),
-    (23, -7): (1, 11),
-    (23, -4): (1, 11),
-    (23, -8): (1, 11),
-    (23, -5): (1, 11),
-    (23, -1): (1, 11),
-    (23, -6): (1, 11),
-    (23, -3): (1, 11),
-    (23, -10): (1, 11),
-    (9, -7): (1, 15),
-    (9, -12): (1, 15),
-    (9, -11): (1, 15),
-    (8, -7): (1, 3),
-    (8, -3): (1, 3),
-    (8, -8): (1, 3),
-    (8, -10): (1, 3),
-    (8, -1): (1, 3),
-    (5, -8): (1, 9),
-    (5, -1): (1, 9),
-    (5, -6): (1, 9),
-    (5, -3): (1, 9),
-    (5, -7): (1, 9),
-    (5, -10): (1, 9),
-    (5, -4): (1, 9),
-    (5, -5): (1, 9),
-    (4, 3): (3, 24),
-    (4, -8): (0, 25),
-    (4, 1): (3, 26),
-    (4, 4): (3, 27),
-    (4, -7): (0, 28),
-    (4, -10): (0, 29),
-    (4, 2): (3, 30),
-    (30, -9): (1, 2),
-    (30, -3): (1, 2),
-    (30, 4): (3, 27),
-    (30, -8): (0, 25),
-    (30, 3): (3, 31),
-    (30, -7): (0, 28),
-    (30, -10): (0, 29),
-    (29, 7): (3, 9),
-    (29, 5): (3, 32),
-    (29, -7): (0, 11),
-    (29, 6): (3, 12),
-    (32, -11): (0, 33),
-    (33, -7): (1, 11),
-    (33, -4): (1, 11),
-    (33, -8): (1, 11),
-    (33, -5): (1, 11),
-    (33, -6): (1, 11),
-    (33, -9): (1, 11),
-    (33, -3): (1, 11),
-    (33, -10): (1, 11),
-    (28, -8): (1, 9),
-    (28, -9): (1, 9),
-    (28, -6): (1, 9),
-    (28, -3): (1, 9),
-    (28, -7): (1, 9),
-    (28, -10): (1, 9),
-    (28, -4): (1, 9),
-    (28, -5): (1, 9),
-    (31, -7): (1, 3),
-    (31, -9): (1, 3),
-    (31, -3): (1, 3),
-    (31, -8): (1, 3),
-    (31, -10): (1, 3),
-    (25, 3): (3, 24),
-    (25, -8): (0, 25),
-    (25, 1): (3, 34),
-    (25, 4): (3, 27),
-    (25, -7): (0, 28),
-    (25, -10): (0, 29),
-    (25, 2): (3, 30),
-    (27, -8): (1, 5),
-    (27, -7): (1, 5),
-    (27, -10): (1, 5),
-    (27, -9): (1, 5),
-    (27, -3): (1, 5),
-    (27, -4): (0, 35),
-    (27, -6): (0, 36),
-    (27, -5): (0, 37),
-    (37, -9): (1, 7),
-    (37, -7): (1, 7),
-    (37, -3): (1, 7),
-    (37, -8): (1, 7),
-    (37, -10): (1, 7),
-    (36, -3): (1, 8),
-    (36, -8): (1, 8),
-    (36, -10): (1, 8),
-    (36, -9): (1, 8),
-    (36, -7): (1, 8),
-    (35, -3): (1, 6),
-    (35, -8): (1, 6),
-    (35, -7): (1, 6),
-    (35, -10): (1, 6),
-    (35, -9): (1, 6),
-    (34, -3): (0, 38),
-    (34, -9): (0, 39),
-    (39, -6): (1, 10),
-    (39, -9): (1, 10),
-    (39, -3): (1, 10),
-    (39, -10): (1, 10),
-    (39, -4): (1, 10),
-    (39, -7): (1, 10),
-    (39, -8): (1, 10),
-    (39, -5): (1, 10),
-    (38, 4): (3, 27),
-    (38, 3): (3, 24),
-    (38, -8): (0, 25),
-    (38, -7): (0, 28),
-    (38, -10): (0, 29),
-    (38, 2): (3, 40),
-    (40, -3): (1, 1),
-    (40, -9): (1, 1),
-    (40, 4): (3, 27),
-    (40, -8): (0, 25),
-    (40, -7): (0, 28),
-    (40, 3): (3, 31),
-    (40, -10): (0, 29),
-    (24, -9): (1, 4),
-    (24, -3): (1, 4),
-    (24, -8): (1, 4),
-    (24, -10): (1, 4),
-    (24, -7): (1, 4),
-    (26, -3): (0, 38),
-    (26, -9): (0, 41),
-    (41, -1): (1, 10),
-    (41, -6): (1, 10),
-    (41, -3): (1, 10),
-    (41, -10): (1, 10),
-    (41, -4): (1, 10),
-    (41, -7): (1, 10),
-    (41, -8): (1, 10),
-    (41, -5): (1, 10),
-    (1, -8): (1, 5),
-    (1, -1): (1, 5),
-    (1, -7): (1, 5),
-    (1, -10): (1, 5),
-    (1, -3): (1, 5),
-    (1, -4): (0, 42),
-    (1, -6): (0, 43),
-    (1, -5): (0, 44),
-    (44, -7): (1, 7),
-    (44, -3): (1, 7),
-    (44, -8): (1, 7),
-    (44, -1): (1, 7),
-    (44, -10): (1, 7),
-    (43, -3): (1, 8),
-    (43, -8): (1, 8),
-    (43, -10): (1, 8),
-    (43, -1): (1, 8),
-    (43, -7): (1, 8),
-    (42, -3): (1, 6),
-    (42, -8): (1, 6),
-    (42, -1): (1, 6),
-    (42, -7): (1, 6),
-    (42, -10): (1, 6),
-    (3, -1): (2, 0),
-    (3, -3): (0, 45),
-    (45, 4): (3, 1),
-    (45, 3): (3, 2),
-    (45, -8): (0, 4),
-    (45, -7): (0, 5),
-    (45, -10): (0, 6),
-    (45, 2): (3, 46),
-    (46, -1): (1, 1),
-    (46, -3): (1, 1),
-    (46, 4): (3, 1),
-    (46, -8): (0, 4),
-    (46, 3): (3, 8),
-    (46, -7): (0, 5),
-    (46, -10): (0, 6),
-    (2, -3): (1, 4),
-    (2, -8): (1, 4),
-    (2, -10): (1, 4),
-    (2, -1): (1, 4),
-    (2, -7): (1, 4),
-}
+ACTIONS = (
+    (-1, -1, -1, 24, -1, 16, 12, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 21, -1, 21, 21, 172, 176, 168, 21, -1, 21),
+    (-1, -1, -1, 17, -1, 17, 17, -1, -1, -1, 17, -1, 17),
+    (-1, -1, -1, 37, -1, 37, 37, 37, 37, 37, 37, -1, 37),
+    (-1, -1, -1, 112, -1, 108, 104, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 180, -1, 2),
+    (-1, -1, -1, -1, -1, -1, 40, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 24, -1, 16, 12, -1, -1, -1, 9, -1, 9),
+    (-1, -1, -1, 13, -1, 13, 13, -1, -1, -1, 13, -1, 13),
+    (-1, 61, 61, -1, -1, -1, 61, -1, -1, -1, -1, -1, -1),
+    (84, 69, 69, -1, -1, -1, 69, -1, -1, -1, -1, -1, -1),
+    (-1, -1, 92, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, 56, 53, -1, -1, -1, 40, -1, -1, -1, -1, -1, -1),
+    (-1, 57, 57, -1, -1, -1, 57, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, 68, -1, -1, -1, -1, -1, -1),
+    (-1, -1, 49, -1, -1, -1, 68, -1, -1, -1, -1, -1, -1),
+    (-1, -1, 61, -1, -1, -1, 61, -1, -1, -1, -1, -1, -1),
+    (72, -1, 69, -1, -1, -1, 69, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, 76, -1, -1, -1, -1, -1, -1),
+    (-1, -1, 65, -1, -1, -1, 65, -1, -1, -1, -1, -1, -1),
+    (-1, -1, 57, -1, -1, -1, 57, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, 88, -1, -1, -1, -1, -1, -1),
+    (-1, 65, 65, -1, -1, -1, 65, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 45, -1, 45, 45, 45, 45, 45, 45, -1, 45),
+    (-1, -1, -1, 21, 21, 21, 21, 156, 160, 152, 21, -1, -1),
+    (-1, -1, -1, -1, 164, -1, -1, -1, -1, -1, 140, -1, -1),
+    (-1, -1, -1, 37, 37, 37, 37, 37, 37, 37, 37, -1, -1),
+    (-1, -1, -1, 112, -1, 108, 104, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, 40, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 17, 17, 17, 17, -1, -1, -1, 17, -1, -1),
+    (-1, -1, -1, 112, 9, 108, 104, -1, -1, -1, 9, -1, -1),
+    (-1, -1, -1, 13, 13, 13, 13, -1, -1, -1, 13, -1, -1),
+    (-1, -1, 132, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 45, 45, 45, 45, 45, 45, 45, 45, -1, -1),
+    (-1, -1, -1, -1, 144, -1, -1, -1, -1, -1, 140, -1, -1),
+    (-1, -1, -1, 112, -1, 108, 104, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 41, 41, 41, 41, 41, 41, 41, 41, -1, -1),
+    (-1, -1, -1, 112, 5, 108, 104, -1, -1, -1, 5, -1, -1),
+    (-1, -1, -1, 25, 25, 25, 25, -1, -1, -1, 25, -1, -1),
+    (-1, -1, -1, 33, 33, 33, 33, -1, -1, -1, 33, -1, -1),
+    (-1, -1, -1, 29, 29, 29, 29, -1, -1, -1, 29, -1, -1),
+    (-1, -1, -1, 41, -1, 41, 41, 41, 41, 41, 41, -1, 41),
+    (-1, -1, -1, 25, -1, 25, 25, -1, -1, -1, 25, -1, 25),
+    (-1, -1, -1, 33, -1, 33, 33, -1, -1, -1, 33, -1, 33),
+    (-1, -1, -1, 29, -1, 29, 29, -1, -1, -1, 29, -1, 29),
+    (-1, -1, -1, 24, -1, 16, 12, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 24, -1, 16, 12, -1, -1, -1, 5, -1, 5),
+)
+
+GOTOS = (
+    (-1, 5, 7, 2, 1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, 25, 30, 29, 24, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, 11, 12, 9),
+    (-1, -1, -1, 8, 1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, 13),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, 15, 16),
+    (-1, -1, -1, -1, -1, -1, -1, 20),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, 34, 30, 29, 24, -1, -1, -1),
+    (-1, -1, -1, -1, -1, 32, 12, 9),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 31, 24, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, 37, 29, 24, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, 31, 24, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, -1, -1, -1, -1, -1, -1),
+    (-1, -1, 46, 2, 1, -1, -1, -1),
+    (-1, -1, -1, 8, 1, -1, -1, -1),
+)
 
 # Automatically generated reduction lookup buffer
-REDUCTIONS = [
+REDUCTIONS = (
     (0,1,accept),
     (1,3,r1),
-    (1,1,r2),
+    (1,1,0),
     (2,2,r3),
-    (2,1,r4),
-    (3,1,r5),
+    (2,1,0),
+    (3,1,0),
     (3,2,r6),
     (3,2,r7),
     (3,2,r8),
     (4,1,r9),
-    (4,3,r10),
+    (4,3,1),
     (4,3,r11),
     (5,3,r12),
-    (5,1,r13),
+    (5,1,0),
     (6,2,r14),
-    (6,1,r15),
+    (6,1,0),
     (7,3,r16),
     (7,1,r17),
-]
+)
 
 
 """ Parser Factory Method """
 
 
+# The parser only keeps its tables, while all parsing state is local to each parse call,
+# so a single instance is built at import time and shared by every caller.
+PARSER = Parser(ACTIONS, GOTOS, REDUCTIONS, Lexer, lambda output: (NFA(), output))
+
+
 def get_parser():
     """
-    Creates a new ComPyLR-RegEx parser.
+    Gets the ComPyLR-RegEx parser.
 
     :return A Parser object used to compile regular expressions to DFAs. 
     """
-    return Parser(TABLE, REDUCTIONS, lambda source: Lexer(source), lambda output: (NFA(), output))
+    return PARSER
+
+
+@lru_cache(maxsize=256)
+def compile_regex(source, output):
+    """
+    Compiles a regular expression to a DFA. Results are cached, so compiling the same expression
+    with the same output again returns the same DFA object, which must therefore not be modified.
+
+    :param source   The regular expression.
+    :param output   The output of the DFA's accepting states. This must be hashable.
+
+    :return A minimal DFA recognising the regular expression.
+    """
+    return PARSER.parse(source, output)